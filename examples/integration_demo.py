@@ -209,7 +209,7 @@ async def demonstrate_plugin_processing():
     print("🔄 Demonstrating plugin processing...")
 
     # Get first email from storage
-    email_id = list(email_storage.keys())[0]
+    email_id = next(iter(email_storage))
     email = email_storage[email_id]
 
     print(f"Original email: {email.email_data.subject}")
@@ -264,7 +264,7 @@ async def demonstrate_ai_format():
     print("🤖 Demonstrating AI format conversion...")
 
     # Get first email
-    email = list(email_storage.values())[0]
+    email = email_storage[next(iter(email_storage))]
 
     # Convert to AI format
     ai_format = AIAnalysisFormat.from_processed_email(email)
@@ -45,6 +45,7 @@ class ServerConfig(BaseSettings):
     # Postmark webhook settings
     postmark_webhook_secret: Optional[str] = None
     webhook_endpoint: str = "/webhook"
+    webhook_batch_max_size: int = 100  # payloads accepted per batch request
 
     # Processing settings
     max_processing_time: float = 2.0  # seconds
@@ -1,9 +1,13 @@
 # Email Data Models for MCP Server
+from collections import deque
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer, field_validator
+
+# Number of most recent processing time samples kept in EmailStats
+PROCESSING_TIME_SAMPLES = 1024
 
 
 class UrgencyLevel(str, Enum):
@@ -89,10 +93,20 @@ class EmailStats(BaseModel):
     avg_urgency_score: float = 0.0
     urgency_distribution: Dict[UrgencyLevel, int] = Field(default_factory=dict)
     last_processed: Optional[datetime] = None
-    processing_times: List[float] = Field(
-        default=[], description="Processing time samples"
+    processing_times: Deque[float] = Field(
+        default_factory=lambda: deque(maxlen=PROCESSING_TIME_SAMPLES),
+        description="Most recent processing time samples",
     )
 
+    @field_validator("processing_times")
+    @classmethod
+    def _bound_processing_times(cls, value: Iterable[float]) -> Deque[float]:
+        return deque(value, maxlen=PROCESSING_TIME_SAMPLES)
+
+    @field_serializer("processing_times")
+    def _serialize_processing_times(self, value: Deque[float]) -> List[float]:
+        return list(value)
+
 
 class PostmarkWebhookPayload(BaseModel):
     """Postmark inbound webhook payload structure"""
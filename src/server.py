@@ -1916,7 +1916,7 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
         email_id = arguments.get("email_id")
 
         try:
-            if email_id not in storage.email_storage:
+            if not email_id or email_id not in storage.email_storage:
                 return [TextContent(type="text", text=f"Email {email_id} not found")]
 
             original_email = storage.email_storage[email_id]
@@ -1,14 +1,298 @@
 # Shared storage for email data between MCP server and webhook
+import itertools
 import os
 import sys
-from typing import Dict
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    ItemsView,
+    Iterator,
+    KeysView,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    ValuesView,
+    overload,
+)
 
 from src.models import EmailStats, ProcessedEmail
 
 # Add src directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Number of independently locked partitions; must be a power of two
+SHARD_COUNT = 16
+
+_T = TypeVar("_T")
+# Distinguishes "no default given" from an explicit None in pop()
+_MISSING: Any = object()
+
+
+class StripedCounter:
+    """Counter split into per-thread cells, in the spirit of Java's LongAdder.
+
+    Each thread adds into its own cell so concurrent writers do not contend
+    on one lock; readers sum the cells. sum() is therefore not an atomic
+    snapshot while writes are in flight.
+    """
+
+    def __init__(self, cells: int = SHARD_COUNT):
+        if cells <= 0 or cells & (cells - 1):
+            raise ValueError("cells must be a positive power of two")
+        self._mask = cells - 1
+        self._cells: List[Union[int, float]] = [0] * cells
+        self._locks = [threading.Lock() for _ in range(cells)]
+        # Threads are assigned cells round-robin on their first add()
+        self._next_cell = itertools.count()
+        self._local = threading.local()
+
+    def _cell_index(self) -> int:
+        index = getattr(self._local, "index", None)
+        if index is None:
+            index = self._local.index = next(self._next_cell) & self._mask
+        return index
+
+    def add(self, value: Union[int, float] = 1) -> None:
+        index = self._cell_index()
+        with self._locks[index]:
+            self._cells[index] += value
+
+    def sum(self) -> Union[int, float]:
+        return sum(self._cells)
+
+    def reset(self) -> None:
+        for index, lock in enumerate(self._locks):
+            with lock:
+                self._cells[index] = 0
+
+
+class _Shard:
+    """Urgency bookkeeping for the keys hashing to one shard.
+
+    Holds no emails, only the score each key contributes and the running
+    (total, count) pair built from them. Written only while the shard's
+    lock is held and replaced as a whole by ShardedEmailStorage.clear(), so
+    the sums can never drift from the scores. The pair is swapped in with a
+    single assignment, so lock-free readers never see a total and a count
+    from different writes.
+    """
+
+    __slots__ = ("scores", "urgency")
+
+    def __init__(self) -> None:
+        # Urgency score each stored key contributes (None when unanalyzed)
+        self.scores: Dict[str, Optional[int]] = {}
+        # (sum of urgency scores, number of analyzed emails)
+        self.urgency: Tuple[int, int] = (0, 0)
+
+    def track(self, score: Optional[int], sign: int) -> None:
+        if score is not None:
+            total, count = self.urgency
+            self.urgency = (total + sign * score, count + sign)
+
+
+class ShardedEmailStorage(MutableMapping[str, ProcessedEmail]):
+    """Dict-like email store whose writers are partitioned into locked shards.
+
+    Writers only contend with writers whose key hashes to the same shard;
+    the shard lock serializes the bookkeeping for a key (its urgency score
+    and its place in the index). Emails themselves live in one insertion
+    ordered index dict. Single dict operations are atomic, so reads go
+    straight to the index without taking any lock. keys(), values() and
+    items() are the index's live views, as with a dict; wrap them in list()
+    for a snapshot that concurrent writes cannot break mid-loop.
+    Each shard keeps running urgency sums for its analyzed emails, so the
+    average can be read without scanning every stored email. Time spent
+    waiting on a shard lock held by another thread is recorded as well, so
+    lock contention can be observed and tested.
+    """
+
+    def __init__(self, shard_count: int = SHARD_COUNT):
+        if shard_count <= 0 or shard_count & (shard_count - 1):
+            raise ValueError("shard_count must be a positive power of two")
+        self._mask = shard_count - 1
+        # Swapped out wholesale by clear(), so writers look a shard up only
+        # once they hold its lock
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._locks = [threading.Lock() for _ in range(shard_count)]
+        # Emails in global insertion order; only written under a shard lock
+        self._index: Dict[str, ProcessedEmail] = {}
+        self._contention_wait_ns = StripedCounter()
+
+    def _index_for(self, key: str) -> int:
+        return hash(key) & self._mask
+
+    def _acquire(self, lock: threading.Lock) -> None:
+        """Acquire ``lock``, timing the wait only when it is contended."""
+        if not lock.acquire(blocking=False):
+            start = time.perf_counter_ns()
+            lock.acquire()
+            self._contention_wait_ns.add(time.perf_counter_ns() - start)
+
+    def __getitem__(self, key: str) -> ProcessedEmail:
+        return self._index[key]
+
+    def _store(self, shard: _Shard, key: str, value: ProcessedEmail) -> None:
+        """Insert or overwrite ``key``; the caller holds the shard's lock."""
+        analysis = getattr(value, "analysis", None)
+        # Record the score now so later in-place edits cannot skew the totals
+        score = analysis.urgency_score if analysis else None
+        if key in shard.scores:
+            shard.track(shard.scores[key], -1)
+        shard.scores[key] = score
+        shard.track(score, 1)
+        # Overwrites keep their original position, as with a dict
+        self._index[key] = value
+
+    def __setitem__(self, key: str, value: ProcessedEmail) -> None:
+        index = self._index_for(key)
+        lock = self._locks[index]
+        self._acquire(lock)
+        try:
+            self._store(self._shards[index], key, value)
+        finally:
+            lock.release()
+
+    def __delitem__(self, key: str) -> None:
+        self.pop(key)
+
+    # The MutableMapping mixins look a key up and then delete or insert it
+    # as two separately locked steps, so a concurrent clear() or del in
+    # between made them raise. Each override below is one locked step.
+
+    @overload
+    def pop(self, key: str) -> ProcessedEmail: ...
+
+    @overload
+    def pop(self, key: str, default: ProcessedEmail) -> ProcessedEmail: ...
+
+    @overload
+    def pop(self, key: str, default: _T) -> Union[ProcessedEmail, _T]: ...
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        index = self._index_for(key)
+        lock = self._locks[index]
+        self._acquire(lock)
+        try:
+            shard = self._shards[index]
+            if key not in shard.scores:
+                if default is _MISSING:
+                    raise KeyError(key)
+                return default
+            shard.track(shard.scores.pop(key), -1)
+            return self._index.pop(key)
+        finally:
+            lock.release()
+
+    def setdefault(self, key: str, default: ProcessedEmail) -> ProcessedEmail:
+        index = self._index_for(key)
+        lock = self._locks[index]
+        self._acquire(lock)
+        try:
+            shard = self._shards[index]
+            if key in shard.scores:
+                return self._index[key]
+            self._store(shard, key, default)
+            return default
+        finally:
+            lock.release()
+
+    def popitem(self) -> Tuple[str, ProcessedEmail]:
+        """Remove and return the oldest (processing ID, email) pair."""
+        while True:
+            try:
+                key = next(iter(self._index))
+            except StopIteration:
+                raise KeyError("popitem(): storage is empty") from None
+            # Another thread may take the key first; then try the next one
+            value = self.pop(key, _MISSING)
+            if value is not _MISSING:
+                return key, value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        # Lazy, like a dict; use list(self) for a snapshot safe under writes
+        return iter(self._index)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.copy()!r})"
+
+    def keys(self) -> KeysView[str]:
+        """Live view of stored processing IDs in insertion order."""
+        return self._index.keys()
+
+    def values(self) -> ValuesView[ProcessedEmail]:
+        """Live view of stored emails in insertion order."""
+        return self._index.values()
+
+    def items(self) -> ItemsView[str, ProcessedEmail]:
+        """Live view of (processing ID, email) pairs in insertion order."""
+        return self._index.items()
+
+    def copy(self) -> Dict[str, ProcessedEmail]:
+        """Return a plain dict copy of the current contents."""
+        return self._index.copy()
+
+    def clear(self) -> None:
+        """Drop all entries by swapping in empty shards and emptying the index.
+
+        Every shard lock is held for the swap so no write can land between
+        the shards and the index, and the urgency sums go with their shards.
+        The index is emptied in place so existing views stay live; the old
+        shards and a copy of the index keep the emails alive until the
+        locks have been dropped, so they are not freed under the locks.
+        """
+        for lock in self._locks:
+            self._acquire(lock)
+        try:
+            retired = self._shards, self._index.copy()
+            self._shards = [_Shard() for _ in self._locks]
+            self._index.clear()
+        finally:
+            for lock in self._locks:
+                lock.release()
+        del retired
+
+    def average_urgency_score(self) -> float:
+        """Mean urgency score of stored emails that have an analysis."""
+        total = count = 0
+        # One read per shard so each shard's total and count always match
+        for shard_total, shard_count in [shard.urgency for shard in self._shards]:
+            total += shard_total
+            count += shard_count
+        return total / count if count else 0.0
+
+    def contention_wait_ns(self) -> int:
+        """Total nanoseconds threads spent blocked on shard locks."""
+        return int(self._contention_wait_ns.sum())
+
+    def reset_contention_wait(self) -> None:
+        """Zero the lock wait metric; stored emails are left untouched."""
+        self._contention_wait_ns.reset()
+
+    def shard_sizes(self) -> List[int]:
+        """Number of stored keys that hash to each shard's lock."""
+        return [len(shard.scores) for shard in self._shards]
+
 
 # Global storage instances
-email_storage: Dict[str, ProcessedEmail] = {}
+email_storage = ShardedEmailStorage()
 stats = EmailStats()
+# Guards read-modify-write updates of ``stats``; readers never take it
+stats_lock = threading.Lock()
+
+
+def reset_stats() -> None:
+    """Reset ``stats`` to defaults in place, keeping existing references valid."""
+    with stats_lock:
+        stats.__dict__.update(EmailStats().__dict__)
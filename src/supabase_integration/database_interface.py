@@ -301,7 +301,6 @@ class SupabaseDatabaseInterface(DatabaseInterface):
                     UrgencyLevel.LOW: status_counts.get("low", 0),
                 },
                 last_processed=datetime.now(),
-                processing_times=[],  # Set default processing times
             )
 
         except APIError as e:
@@ -833,7 +832,6 @@ class SupabaseDatabaseInterface(DatabaseInterface):
                     UrgencyLevel.MEDIUM: 0,
                     UrgencyLevel.HIGH: 0,
                 },
-                processing_times=[],
             )
         except Exception as e:
             raise RuntimeError(f"Failed to get email statistics: {str(e)}") from e
@@ -364,7 +364,7 @@ class SupabasePlugin(PluginInterface):
             "last_processed": (
                 stats.last_processed.isoformat() if stats.last_processed else None
             ),
-            "processing_times": stats.processing_times,
+            "processing_times": list(stats.processing_times),
         }
 
     # Real-time Methods
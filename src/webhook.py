@@ -7,7 +7,7 @@
 #   * Can be overridden via HOST environment variable
 # - PORT: Configurable via PORT environment variable (default: 8081)
 #
-import hashlib
+import binascii
 import hmac
 import json
 import os
@@ -16,6 +16,7 @@ import time
 import uuid
 from datetime import datetime, timezone
 from typing import (
+    Any,
     Dict,
     Optional,
 )
@@ -26,9 +27,10 @@ from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
 from . import storage
-from .config import config
+from .config import ServerConfig, config
 from .extraction import email_extractor
 from .logging_system import (
+    EmailProcessingLogger,
     logger,
 )
 from .models import (
@@ -88,10 +90,14 @@ def verify_webhook_signature(body: bytes, signature: str, secret: str) -> bool:
     else:
         return False
 
-    expected_signature = hmac.new(
-        secret.encode("utf-8"), body_bytes, hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(signature, expected_signature)
+    # Compare raw digests: half the bytes of the hex form, and no hexdigest().
+    # unhexlify, unlike bytes.fromhex, rejects whitespace inside the signature
+    try:
+        provided_digest = binascii.unhexlify(signature)
+    except (binascii.Error, ValueError):
+        return False
+    expected_digest = hmac.digest(secret.encode("utf-8"), body_bytes, "sha256")
+    return hmac.compare_digest(provided_digest, expected_digest)
 
 
 def extract_email_data(
@@ -272,25 +278,90 @@ async def _save_to_database(
 
 def _update_stats(processing_time_taken: float) -> None:
     """Update global processing statistics."""
-    storage.stats.total_processed += 1
-    storage.stats.last_processed = datetime.now(
-        timezone.utc
-    )  # Use timezone aware datetime
-    storage.stats.processing_times.append(processing_time_taken)
-
-    if storage.stats.total_processed > 0:
-        emails_with_analysis = [
-            email for email in storage.email_storage.values() if email.analysis
-        ]
-        if emails_with_analysis:  # Avoid division by zero
-            total_urgency = sum(
-                email.analysis.urgency_score
-                for email in emails_with_analysis
-                if email.analysis
-            )
-            storage.stats.avg_urgency_score = total_urgency / len(emails_with_analysis)
-        else:
-            storage.stats.avg_urgency_score = 0.0  # Default if no emails have analysis
+    with storage.stats_lock:
+        storage.stats.total_processed += 1
+        storage.stats.last_processed = datetime.now(
+            timezone.utc
+        )  # Use timezone aware datetime
+        storage.stats.processing_times.append(processing_time_taken)
+    # The storage keeps running urgency totals, so no rescan of every email
+    storage.stats.avg_urgency_score = storage.email_storage.average_urgency_score()
+
+
+async def _process_webhook_payload(
+    webhook_payload: PostmarkWebhookPayload,
+    payload_data: Dict[str, Any],
+    processing_id: str,
+    processing_start_time: float,
+) -> ProcessedEmail:
+    """Analyze, store and record a single validated Postmark payload."""
+    email_data = extract_email_data(webhook_payload)
+    logger.log_email_received(
+        email_data, webhook_payload.model_dump()
+    )  # Pass dict for logging
+
+    logger.log_extraction_start(email_data)
+    extracted_metadata = email_extractor.extract_from_email(email_data)
+
+    urgency_score, urgency_level_str = email_extractor.calculate_urgency_score(
+        extracted_metadata.urgency_indicators
+    )
+    sentiment = _determine_sentiment(extracted_metadata.sentiment_indicators)
+    logger.log_extraction_complete(
+        email_data, extracted_metadata, urgency_score, sentiment
+    )
+
+    email_analysis = _create_email_analysis(
+        extracted_metadata,
+        urgency_score,
+        urgency_level_str,
+        sentiment,
+    )
+    processed_email = ProcessedEmail(
+        id=processing_id,
+        email_data=email_data,
+        analysis=email_analysis,
+        status=EmailStatus.ANALYZED,
+        # Use timezone aware datetime
+        processed_at=datetime.now(timezone.utc),
+        webhook_payload=payload_data,  # Store original payload if needed later
+    )
+
+    storage.email_storage[processing_id] = processed_email
+
+    # Enhance email with plugins
+    processed_email = await _process_through_plugins(processed_email, processing_id)
+    storage.email_storage[processing_id] = (
+        processed_email  # Re-store if plugins modified it
+    )
+
+    await _save_to_database(processed_email, processing_id)
+
+    processing_time_taken = time.time() - processing_start_time
+    _update_stats(processing_time_taken)
+    logger.log_email_processed(processed_email, processing_time_taken)
+
+    return processed_email
+
+
+def _log_invalid_json(error: ValueError, body: bytes) -> None:
+    logger.log_processing_error(
+        error,
+        {
+            "error_type": "json_decode",
+            "body_preview": body[:200].decode("utf-8", errors="replace"),
+        },
+    )
+
+
+def _log_validation_error(error: ValidationError) -> None:
+    logger.log_processing_error(
+        error,
+        {
+            "error_type": "validation_error",
+            "validation_errors": str(error),
+        },
+    )
 
 
 # --- Main Postmark Webhook Endpoint ---
@@ -315,79 +386,26 @@ async def handle_postmark_webhook(
             uuid.uuid4()
         )  # Generate unique ID for this processing instance
 
-        email_data = extract_email_data(webhook_payload)
-        logger.log_email_received(
-            email_data, webhook_payload.model_dump()
-        )  # Pass dict for logging
-
-        logger.log_extraction_start(email_data)
-        extracted_metadata = email_extractor.extract_from_email(email_data)
-
-        urgency_score, urgency_level_str = email_extractor.calculate_urgency_score(
-            extracted_metadata.urgency_indicators
-        )
-        sentiment = _determine_sentiment(extracted_metadata.sentiment_indicators)
-        logger.log_extraction_complete(
-            email_data, extracted_metadata, urgency_score, sentiment
-        )
-
-        email_analysis = _create_email_analysis(
-            extracted_metadata,
-            urgency_score,
-            urgency_level_str,
-            sentiment,
-        )
-        processed_email = ProcessedEmail(
-            id=processing_id,
-            email_data=email_data,
-            analysis=email_analysis,
-            status=EmailStatus.ANALYZED,
-            # Use timezone aware datetime
-            processed_at=datetime.now(timezone.utc),
-            webhook_payload=payload_data,  # Store original payload if needed later
-        )
-
-        storage.email_storage[processing_id] = processed_email
-
-        # Enhance email with plugins
-        processed_email = await _process_through_plugins(processed_email, processing_id)
-        storage.email_storage[processing_id] = (
-            processed_email  # Re-store if plugins modified it
+        processed_email = await _process_webhook_payload(
+            webhook_payload, payload_data, processing_id, processing_start_time
         )
 
-        await _save_to_database(processed_email, processing_id)
-
-        processing_time_taken = time.time() - processing_start_time
-        _update_stats(processing_time_taken)
-        logger.log_email_processed(processed_email, processing_time_taken)
-
         return JSONResponse(
             status_code=200,
             content={
                 "status": "success",
                 "processing_id": processing_id,
                 "message": f"Email {
-                    email_data.message_id} processed successfully.",
+                    processed_email.email_data.message_id} processed successfully.",
             },
         )
 
-    except json.JSONDecodeError as e:
-        logger.log_processing_error(
-            e,
-            {
-                "error_type": "json_decode",
-                "body_preview": body[:200].decode("utf-8", errors="replace"),
-            },
-        )
+    # A body that is not UTF-8 cannot be JSON, so it is rejected the same way
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        _log_invalid_json(e, body)
         raise HTTPException(status_code=400, detail="Invalid JSON payload.") from e
     except ValidationError as e:
-        logger.log_processing_error(
-            e,
-            {
-                "error_type": "validation_error",
-                "validation_errors": str(e),
-            },
-        )
+        _log_validation_error(e)
         raise HTTPException(
             status_code=422, detail=f"Validation error: {str(e)}"
         ) from e
@@ -398,7 +416,8 @@ async def handle_postmark_webhook(
     except Exception as e:
         context_id = processing_id if processing_id else "N/A"
         logger.log_processing_error(e, {"processing_id": context_id})
-        storage.stats.total_errors += 1
+        with storage.stats_lock:
+            storage.stats.total_errors += 1
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred during email processing: {
@@ -406,6 +425,100 @@ async def handle_postmark_webhook(
         )
 
 
+@app.post(f"{config.webhook_endpoint}/batch")
+async def handle_postmark_webhook_batch(
+    request: Request,
+    x_postmark_signature: Optional[str] = Header(None),
+):
+    """
+    Handle a JSON array of Postmark inbound payloads in a single request.
+    The whole batch is validated before any email is processed; failures
+    while processing individual emails are reported per item.
+    """
+    body: bytes = b""
+
+    try:
+        body = await request.body()
+        await _ensure_webhook_is_authentic(body, x_postmark_signature)
+
+        payloads_data = json.loads(body.decode("utf-8"))
+        if not isinstance(payloads_data, list):
+            raise HTTPException(
+                status_code=422, detail="Batch payload must be a JSON array."
+            )
+        if len(payloads_data) > config.webhook_batch_max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=(
+                    f"Batch of {len(payloads_data)} emails exceeds the limit of "
+                    f"{config.webhook_batch_max_size}."
+                ),
+            )
+        webhook_payloads = [
+            PostmarkWebhookPayload.model_validate(payload_data)
+            for payload_data in payloads_data
+        ]
+    # A body that is not UTF-8 cannot be JSON, so it is rejected the same way
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        _log_invalid_json(e, body)
+        raise HTTPException(status_code=400, detail="Invalid JSON payload.") from e
+    except ValidationError as e:
+        _log_validation_error(e)
+        raise HTTPException(
+            status_code=422, detail=f"Validation error: {str(e)}"
+        ) from e
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.log_processing_error(e, {"processing_id": "N/A"})
+        with storage.stats_lock:
+            storage.stats.total_errors += 1
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred during batch processing: {
+                str(e)}",
+        ) from e
+
+    results = []
+    for webhook_payload, payload_data in zip(webhook_payloads, payloads_data):
+        processing_start_time = time.time()
+        processing_id = str(uuid.uuid4())
+        try:
+            await _process_webhook_payload(
+                webhook_payload, payload_data, processing_id, processing_start_time
+            )
+            results.append(
+                {
+                    "status": "success",
+                    "processing_id": processing_id,
+                    "message_id": webhook_payload.MessageID,
+                }
+            )
+        except Exception as e:
+            logger.log_processing_error(e, {"processing_id": processing_id})
+            with storage.stats_lock:
+                storage.stats.total_errors += 1
+            results.append(
+                {
+                    "status": "error",
+                    "processing_id": processing_id,
+                    "message_id": webhook_payload.MessageID,
+                    "detail": str(e),
+                }
+            )
+
+    failed = sum(1 for result in results if result["status"] == "error")
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "success" if not failed else "partial",
+            "processed": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        },
+    )
+
+
 # --- Health and Basic API Endpoints (specific to this webhook service) ---
 
 
@@ -428,43 +541,69 @@ async def detailed_health_check():
 # --- API Routes Integration ---
 # Import and include the API routes from the separate module for better
 # modularity
-try:
-    from .api_routes import router as api_router
 
-    app.include_router(api_router, prefix="/api", tags=["API"])
-    logger.info("Successfully loaded API routes from api_routes module")
-except ImportError as e:
-    logger.warning(f"Could not load API routes module: {e}")
-    # Continue without API routes if module is not available
+
+def _try_register_api_routes(target_app: FastAPI, log: EmailProcessingLogger) -> bool:
+    """Mount the REST API router on ``target_app`` if api_routes can be imported."""
+    try:
+        from .api_routes import router as api_router
+    except ImportError as e:
+        log.warning(f"Could not load API routes module: {e}")
+        # Continue without API routes if module is not available
+        return False
+
+    target_app.include_router(api_router, prefix="/api", tags=["API"])
+    log.info("Successfully loaded API routes from api_routes module")
+    return True
+
+
+_try_register_api_routes(app, logger)
 
 # --- Serverless Environment Optimizations & Uvicorn Launch ---
 
-SERVERLESS_ENV = (
-    os.getenv("VERCEL", "0") == "1" or os.getenv("AWS_LAMBDA_FUNCTION_NAME") is not None
-)
-VERCEL_ENV = os.getenv("VERCEL", "0") == "1"
 
-if SERVERLESS_ENV:
+def _apply_serverless_config(
+    server_config: ServerConfig, log: EmailProcessingLogger
+) -> bool:
+    """Tune ``server_config`` for Vercel/AWS Lambda when running there.
+
+    Returns True if a serverless environment was detected.
+    """
+    serverless_env = (
+        os.getenv("VERCEL", "0") == "1"
+        or os.getenv("AWS_LAMBDA_FUNCTION_NAME") is not None
+    )
+    if not serverless_env:
+        return False
+
+    vercel_env = os.getenv("VERCEL", "0") == "1"
     # Apply serverless-specific configurations
-    logger.info(
-        f"🚀 Running in serverless environment (Vercel: {VERCEL_ENV}). "
+    log.info(
+        f"🚀 Running in serverless environment (Vercel: {vercel_env}). "
         f"Applying optimizations..."
     )
-    config.enable_async_processing = True  # Example, may depend on serverless_utils
-    config.max_processing_time = min(
-        config.max_processing_time,
+    # Example, may depend on serverless_utils
+    server_config.enable_async_processing = True
+    server_config.max_processing_time = min(
+        server_config.max_processing_time,
         25,  # Leave buffer for Vercel's typical max duration
     )
     # Logging format might be controlled by environment or Vercel's log drains
-    if config.log_format != "json":  # Prefer JSON logs in serverless if not already set
-        logger.info("Switching log_format to JSON for serverless environment.")
-        config.log_format = "json"
-    if config.enable_console_colors:
-        config.enable_console_colors = (
+    # Prefer JSON logs in serverless if not already set
+    if server_config.log_format != "json":
+        log.info("Switching log_format to JSON for serverless environment.")
+        server_config.log_format = "json"
+    if server_config.enable_console_colors:
+        server_config.enable_console_colors = (
             False  # Colors are not useful in most serverless log viewers
         )
 
-    logger.setup_logging()  # Re-initialize logger with potentially updated config
+    log.setup_logging()  # Re-initialize logger with potentially updated config
+    return True
+
+
+SERVERLESS_ENV = _apply_serverless_config(config, logger)
+VERCEL_ENV = os.getenv("VERCEL", "0") == "1"
 
 if __name__ == "__main__":
     import uvicorn
@@ -4,6 +4,7 @@ Pytest configuration and shared fixtures for unit tests
 
 import asyncio
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -269,15 +270,58 @@ def clean_storage():
     # Clear global storage
     print(f"CONFTEST: Cleaning storage, current length: {len(storage.email_storage)}")
     storage.email_storage.clear()
-    storage.stats.total_processed = 0
-    storage.stats.total_errors = 0
-    storage.stats.avg_urgency_score = 0.0
-    storage.stats.last_processed = None
-    storage.stats.processing_times.clear()
+    storage.reset_stats()
     print(f"CONFTEST: Storage cleaned, new length: {len(storage.email_storage)}")
     return storage.email_storage
 
 
+class _SignallingLock:
+    """Lock stand-in that reports each writer that found it already held"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocked = threading.Semaphore(0)
+
+    def acquire(self, blocking=True):
+        if blocking:
+            return self._lock.acquire()
+        acquired = self._lock.acquire(blocking=False)
+        if not acquired:
+            self._blocked.release()
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def wait_for_blocked(self, count, timeout=5.0):
+        """Wait until ``count`` writers have failed to take the lock"""
+        return all(self._blocked.acquire(timeout=timeout) for _ in range(count))
+
+
+@pytest.fixture
+def signalling_shard_lock():
+    """Swap a storage shard lock for one that reports blocked writers"""
+    swapped = []
+
+    def install(store, index):
+        lock = _SignallingLock()
+        swapped.append((store, index, store._locks[index]))
+        store._locks[index] = lock
+        return lock
+
+    yield install
+
+    for store, index, original in reversed(swapped):
+        store._locks[index] = original
+
+
 @pytest.fixture
 def sample_email_model():
     """Sample EmailData model for testing"""
@@ -10,6 +10,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from src import storage
+from src.api_routes import get_emails
 
 # Importer le logger utilisé dans api_routes.py pour pouvoir le mocker
 from src.logging_system import logger as api_routes_logger
@@ -74,11 +75,7 @@ def sample_processed_email():
 def clear_storage():
     """Clear storage before each test"""
     storage.email_storage.clear()
-    storage.stats.total_processed = 0
-    storage.stats.total_errors = 0
-    storage.stats.avg_urgency_score = 0.0
-    storage.stats.processing_times = []
-    storage.stats.last_processed = None
+    storage.reset_stats()
 
 
 class TestAPIRoutes:
@@ -170,6 +167,40 @@ class TestAPIRoutes:
         assert data["total"] == 15
         assert len(data["emails"]) == 5
 
+    @pytest.mark.asyncio
+    async def test_emails_endpoint_with_filters(self, sample_processed_email):
+        """Filters are checked against the handler directly, without HTTP."""
+        for i, (level, sentiment) in enumerate(
+            [
+                (UrgencyLevel.HIGH, "positive"),
+                (UrgencyLevel.MEDIUM, "negative"),
+                (UrgencyLevel.LOW, "neutral"),
+            ]
+        ):
+            email = sample_processed_email.model_copy(deep=True)
+            email.id = f"test-email-{i}"
+            email.email_data.subject = f"Subject {i}"
+            email.analysis.urgency_level = level
+            email.analysis.sentiment = sentiment
+            storage.email_storage[email.id] = email
+
+        filters = {"urgency_level": None, "sentiment": None, "search": None}
+
+        by_urgency = await get_emails(
+            skip=0, limit=100, **{**filters, "urgency_level": "high"}
+        )
+        assert [e["id"] for e in by_urgency["emails"]] == ["test-email-0"]
+
+        by_sentiment = await get_emails(
+            skip=0, limit=100, **{**filters, "sentiment": "negative"}
+        )
+        assert [e["id"] for e in by_sentiment["emails"]] == ["test-email-1"]
+
+        by_search = await get_emails(
+            skip=0, limit=100, **{**filters, "search": "subject 2"}
+        )
+        assert [e["id"] for e in by_search["emails"]] == ["test-email-2"]
+
     @patch("src.api_routes.storage.email_storage")
     @patch.object(api_routes_logger, "error")
     def test_emails_endpoint_generic_exception(
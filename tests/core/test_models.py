@@ -6,6 +6,7 @@ import pytest
 from pydantic import ValidationError
 
 from src.models import (
+    PROCESSING_TIME_SAMPLES,
     AttachmentData,
     EmailAnalysis,
     EmailData,
@@ -302,7 +303,7 @@ class TestEmailStats:
         assert stats.avg_urgency_score == 0.0
         assert stats.urgency_distribution == {}
         assert stats.last_processed is None
-        assert stats.processing_times == []
+        assert list(stats.processing_times) == []
 
     def test_stats_with_data(self):
         """Test EmailStats with actual data"""
@@ -327,6 +328,20 @@ class TestEmailStats:
         assert stats.urgency_distribution[UrgencyLevel.LOW] == 5
         assert len(stats.processing_times) == 3
 
+    def test_stats_processing_times_bounded(self):
+        """Test processing times keep only the most recent samples"""
+        stats = EmailStats(processing_times=[0.1, 0.2, 0.3, 0.4, 0.5])
+        assert len(stats.processing_times) == 5
+
+        for i in range(PROCESSING_TIME_SAMPLES):
+            stats.processing_times.append(float(i))
+
+        assert len(stats.processing_times) == PROCESSING_TIME_SAMPLES
+        assert stats.processing_times[0] == 0.0
+        assert stats.model_dump(mode="json")["processing_times"] == [
+            float(i) for i in range(PROCESSING_TIME_SAMPLES)
+        ]
+
 
 class TestPostmarkWebhookPayload:
     """Test PostmarkWebhookPayload model"""
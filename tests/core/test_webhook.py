@@ -1,21 +1,25 @@
 """Unit tests for webhook.py - Postmark Webhook Handler"""
 
-import hashlib
 import hmac
+import json
 import os
 import sys
+import threading
 from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List, Optional
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.testclient import TestClient
 
 from src import storage
+from src.config import ServerConfig
 from src.config import config as app_config
 
 # Importation directe de webhook_email_extractor n'est pas nécessaire ici si on mock src.webhook.email_extractor
-from src.extraction import ExtractedMetadata
+from src.extraction import EmailExtractor, ExtractedMetadata
 from src.models import (
     EmailAnalysis,
     EmailData,
@@ -25,26 +29,79 @@ from src.models import (
     UrgencyLevel,
 )
 from src.webhook import (
+    _apply_serverless_config,
     _create_email_analysis,
     _determine_sentiment,
     _ensure_webhook_is_authentic,
     _process_through_plugins,
     _save_to_database,
+    _try_register_api_routes,
     _update_stats,
+    app,
     extract_email_data,
+    handle_postmark_webhook,
     verify_webhook_signature,
 )
 
 
+def _sig(secret: str, body: bytes) -> str:
+    """Hex HMAC-SHA256 signature, via the one-shot hmac.digest() path."""
+    return hmac.digest(secret.encode("utf-8"), body, "sha256").hex()
+
+
+def _metadata(**overrides) -> ExtractedMetadata:
+    """Real ExtractedMetadata with empty defaults, cheaper to read than a mock."""
+    fields = {
+        "urgency_indicators": {"high": [], "medium": [], "low": []},
+        "temporal_references": [],
+        "contact_info": {},
+        "links": [],
+        "action_words": [],
+        "sentiment_indicators": {"positive": [], "negative": [], "neutral": []},
+        "priority_keywords": [],
+    }
+    fields.update(overrides)
+    return ExtractedMetadata(**fields)
+
+
+# Signatures are deterministic, so compute them once at import time.
+_TEST_SECRET = "test-secret"
+_TEST_BODY = b'{"test": "data"}'
+_TEST_SIGNATURE = _sig(_TEST_SECRET, _TEST_BODY)
+_SECRET1_SIGNATURE = _sig("secret1", _TEST_BODY)
+_AUTH_BODY = b'{"data":"valid"}'
+_AUTH_SIGNATURE = _sig("test_secret", _AUTH_BODY)
+
+
+class _StubRequest:
+    """Minimal stand-in for starlette's Request, exposing only body()."""
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self.headers = {"content-type": "application/json"}
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+class _DatabaseStub:
+    """Async database interface recording store_email() calls."""
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.calls: List[ProcessedEmail] = []
+        self._error = error
+
+    async def store_email(self, email: ProcessedEmail) -> None:
+        self.calls.append(email)
+        if self._error is not None:
+            raise self._error
+
+
 @pytest.fixture(autouse=True)
 def clear_storage_and_mocks():
     """Clear storage and reset necessary mocks before each test"""
     storage.email_storage.clear()
-    storage.stats.total_processed = 0
-    storage.stats.total_errors = 0
-    storage.stats.avg_urgency_score = 0.0
-    storage.stats.processing_times = []
-    storage.stats.last_processed = None
+    storage.reset_stats()
 
     original_secret = app_config.postmark_webhook_secret
     original_log_format = app_config.log_format
@@ -55,9 +112,9 @@ def clear_storage_and_mocks():
     app_config.enable_console_colors = original_colors
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_postmark_payload():
-    """Sample Postmark webhook payload for testing"""
+    """Sample Postmark webhook payload, shared by the session; do not mutate"""
     return {
         "From": "john.doe@example.com",
         "FromName": "John Doe",
@@ -77,11 +134,16 @@ def sample_postmark_payload():
     }
 
 
-@pytest.fixture
-def sample_email_data_model(sample_postmark_payload):
-    """Sample EmailData model instance for testing helpers"""
-    webhook_payload = PostmarkWebhookPayload(**sample_postmark_payload)
-    return extract_email_data(webhook_payload)
+@pytest.fixture(scope="session")
+def sample_webhook_payload(sample_postmark_payload):
+    """Parsed PostmarkWebhookPayload, validated once per session"""
+    return PostmarkWebhookPayload(**sample_postmark_payload)
+
+
+@pytest.fixture(scope="session")
+def sample_email_data_model(sample_webhook_payload):
+    """Sample EmailData model instance for testing helpers; do not mutate"""
+    return extract_email_data(sample_webhook_payload)
 
 
 @pytest.fixture
@@ -98,20 +160,37 @@ def sample_extracted_metadata():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
-    from src.webhook import app as webhook_fastapi_app
+    return TestClient(app)
 
-    return TestClient(webhook_fastapi_app)
+
+@pytest.fixture
+def webhook_mocks(monkeypatch):
+    """Replace the webhook's collaborators and expose the mocks by name"""
+    mocks = SimpleNamespace(
+        config=MagicMock(),
+        extractor=MagicMock(spec=EmailExtractor),
+        logger=MagicMock(),
+        plugins=AsyncMock(),
+        save_db=AsyncMock(),
+    )
+    monkeypatch.setattr("src.webhook.config", mocks.config)
+    monkeypatch.setattr("src.webhook.email_extractor", mocks.extractor)
+    monkeypatch.setattr("src.webhook.logger", mocks.logger)
+    monkeypatch.setattr("src.webhook._process_through_plugins", mocks.plugins)
+    monkeypatch.setattr("src.webhook._save_to_database", mocks.save_db)
+    return mocks
 
 
 @pytest.fixture
 def sample_processed_email(sample_email_data_model, sample_extracted_metadata):
     # This metadata is specifically for what _create_email_analysis uses from ExtractedMetadata
-    metadata_for_analysis_creation = MagicMock(spec=ExtractedMetadata)
-    metadata_for_analysis_creation.priority_keywords = ["urgent", "deadline"]
-    metadata_for_analysis_creation.action_words = ["review"]
-    metadata_for_analysis_creation.temporal_references = ["tomorrow"]
+    metadata_for_analysis_creation = _metadata(
+        priority_keywords=["urgent", "deadline"],
+        action_words=["review"],
+        temporal_references=["tomorrow"],
+    )
 
     analysis = _create_email_analysis(
         metadata_for_analysis_creation, 80.0, "high", "positive"
@@ -129,12 +208,9 @@ class TestWebhookSignatureVerification:
     """Test webhook signature verification"""
 
     def test_verify_webhook_signature_valid(self):
-        secret = "test-secret"
-        body = b'{"test": "data"}'
-        expected_signature = hmac.new(
-            secret.encode("utf-8"), body, hashlib.sha256
-        ).hexdigest()
-        assert verify_webhook_signature(body, expected_signature, secret) is True
+        assert (
+            verify_webhook_signature(_TEST_BODY, _TEST_SIGNATURE, _TEST_SECRET) is True
+        )
 
     def test_verify_webhook_signature_invalid(self):
         secret = "test-secret"
@@ -149,11 +225,10 @@ class TestWebhookSignatureVerification:
         assert verify_webhook_signature(body, signature, None) is True
 
     def test_verify_webhook_signature_different_secret(self):
-        body = b'{"test": "data"}'
-        secret1 = "secret1"
-        signature = hmac.new(secret1.encode("utf-8"), body, hashlib.sha256).hexdigest()
-        secret2 = "secret2"
-        assert verify_webhook_signature(body, signature, secret2) is False
+        # _SECRET1_SIGNATURE was made with "secret1", so "secret2" must reject it
+        assert (
+            verify_webhook_signature(_TEST_BODY, _SECRET1_SIGNATURE, "secret2") is False
+        )
 
     def test_verify_webhook_signature_edge_cases(self):
         """Test body not str or bytes, None signature, empty/None secret"""
@@ -166,19 +241,37 @@ class TestWebhookSignatureVerification:
             verify_webhook_signature(123, "sig", "secret") is False
         )  # Test non-str/bytes body
 
+    def test_verify_webhook_signature_malformed_hex(self):
+        """Non-hex, truncated or spaced signatures are rejected, not raised"""
+        assert verify_webhook_signature(_TEST_BODY, "zz" * 32, _TEST_SECRET) is False
+        assert (
+            verify_webhook_signature(_TEST_BODY, _TEST_SIGNATURE[:-2], _TEST_SECRET)
+            is False
+        )
+        spaced = " ".join(
+            _TEST_SIGNATURE[i : i + 2] for i in range(0, len(_TEST_SIGNATURE), 2)
+        )
+        assert verify_webhook_signature(_TEST_BODY, spaced, _TEST_SECRET) is False
+        assert verify_webhook_signature(_TEST_BODY, "é" * 64, _TEST_SECRET) is False
+        assert (
+            verify_webhook_signature(
+                _TEST_BODY.decode("utf-8"), _TEST_SIGNATURE, _TEST_SECRET
+            )
+            is True
+        )
+
 
 class TestEmailDataExtraction:
     """Test email data extraction from Postmark payload"""
 
-    def test_extract_email_data_basic(self, sample_postmark_payload):
-        webhook_payload = PostmarkWebhookPayload(**sample_postmark_payload)
-        email_data = extract_email_data(webhook_payload)
+    def test_extract_email_data_basic(self, sample_webhook_payload):
+        email_data = extract_email_data(sample_webhook_payload)
         assert isinstance(email_data, EmailData)
         assert email_data.message_id == "test-message-123@example.com"
 
     def test_extract_email_data_no_cc_bcc_full(self, sample_postmark_payload):
         """Test extraction when CcFull or BccFull are None or empty."""
-        payload_data = sample_postmark_payload.copy()
+        payload_data = sample_postmark_payload
         payload_data_none = payload_data.copy()
         payload_data_none["CcFull"] = None
         payload_data_none["BccFull"] = None
@@ -204,8 +297,8 @@ class TestWebhookHelperFunctions:
         original_secret = app_config.postmark_webhook_secret
         try:
             app_config.postmark_webhook_secret = "test_secret"
-            valid_body = b'{"data":"valid"}'
-            valid_sig = hmac.new(b"test_secret", valid_body, hashlib.sha256).hexdigest()
+            valid_body = _AUTH_BODY
+            valid_sig = _AUTH_SIGNATURE
             await _ensure_webhook_is_authentic(
                 valid_body, valid_sig
             )  # Should not raise
@@ -248,12 +341,10 @@ class TestWebhookHelperFunctions:
 
     def test_update_stats(self):
         storage.email_storage.clear()
-        storage.stats.total_processed = 0
-        storage.stats.processing_times = []
-        storage.stats.avg_urgency_score = 0.0
+        storage.reset_stats()
         _update_stats(0.123)
         assert storage.stats.total_processed == 1
-        assert storage.stats.processing_times == [0.123]
+        assert list(storage.stats.processing_times) == [0.123]
         assert storage.stats.last_processed is not None
 
         email_data_a = EmailData(
@@ -296,6 +387,24 @@ class TestWebhookHelperFunctions:
         assert storage.stats.total_processed == 3
         assert storage.stats.avg_urgency_score == (60.0 + 80.0) / 2
 
+    def test_update_stats_concurrent(self):
+        """Concurrent updates must not lose increments."""
+        # Stay under PROCESSING_TIME_SAMPLES so no appended sample is evicted
+        num_threads, updates_per_thread = 8, 100
+
+        def update_many():
+            for _ in range(updates_per_thread):
+                _update_stats(0.01)
+
+        threads = [threading.Thread(target=update_many) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert storage.stats.total_processed == num_threads * updates_per_thread
+        assert len(storage.stats.processing_times) == num_threads * updates_per_thread
+
     @pytest.mark.asyncio
     @patch("src.webhook.integration_registry")
     async def test_process_through_plugins(self, mock_registry, sample_processed_email):
@@ -337,23 +446,18 @@ class TestWebhookHelperFunctions:
             await _save_to_database(sample_processed_email, "test-id")
             assert mock_registry.get_database.call_count == 2
         mock_registry.get_database.reset_mock()
-        mock_db_interface = AsyncMock()
-        mock_registry.get_database.return_value = mock_db_interface
+        db_stub = _DatabaseStub()
+        mock_registry.get_database.return_value = db_stub
         with patch("src.webhook.INTEGRATIONS_AVAILABLE", True):
             await _save_to_database(sample_processed_email, "test-id-save")
-            mock_db_interface.store_email.assert_called_once_with(
-                sample_processed_email
-            )
+            assert db_stub.calls == [sample_processed_email]
         mock_registry.get_database.reset_mock()
-        mock_db_interface_fail = AsyncMock()
-        mock_db_interface_fail.store_email.side_effect = Exception("DB save boom!")
-        mock_registry.get_database.return_value = mock_db_interface_fail
+        failing_db_stub = _DatabaseStub(error=Exception("DB save boom!"))
+        mock_registry.get_database.return_value = failing_db_stub
         with patch("src.webhook.INTEGRATIONS_AVAILABLE", True):
             with patch("src.webhook.logger.error") as mock_logger_error:
                 await _save_to_database(sample_processed_email, "test-id-db-fail")
-                mock_db_interface_fail.store_email.assert_called_once_with(
-                    sample_processed_email
-                )
+                assert failing_db_stub.calls == [sample_processed_email]
                 mock_logger_error.assert_called_once()
 
 
@@ -381,82 +485,100 @@ class TestWebhookEndpoints:
 class TestWebhookProcessing:
     """Test main webhook processing functionality"""
 
-    @patch("src.webhook.config")  # Changed from src.webhook.app_config
-    @patch("src.webhook.logger")
-    @patch("src.webhook._ensure_webhook_is_authentic", new_callable=AsyncMock)
-    @patch("src.webhook.extract_email_data")
-    @patch(
-        "src.webhook.email_extractor"  # Changed from webhook_email_extractor
-    )  # Target the imported instance in webhook.py
-    @patch("src.webhook._update_stats")  # Mock this to isolate its logic
-    @patch("src.webhook._process_through_plugins", new_callable=AsyncMock)
-    @patch("src.webhook._save_to_database", new_callable=AsyncMock)
-    def test_webhook_generic_exception_handling(
-        self,
-        mock_save_db,
-        mock_process_plugins,
-        mock_update_stats,
-        mock_email_extractor_instance,
-        mock_extract_email_data_func,
-        mock_auth,
-        mock_logger,
-        mock_app_config_instance,  # Use the mock for app_config
-        sample_postmark_payload,
-        client,
+    @pytest.mark.asyncio
+    async def test_webhook_generic_exception_handling(
+        self, webhook_mocks, monkeypatch, sample_postmark_payload
     ):
         """Test the generic Exception handler in handle_postmark_webhook."""
-        mock_app_config_instance.postmark_webhook_secret = None
-
-        mock_update_stats.side_effect = Exception("Unexpected boom in stats update!")
-
-        mock_auth.return_value = None
-        mock_email_data_instance = MagicMock(spec=EmailData)
-        mock_email_data_instance.message_id = "generic-error-test"
-        mock_extract_email_data_func.return_value = mock_email_data_instance
-
-        # Correctly mock ExtractedMetadata instance
-        mock_extracted_metadata = MagicMock(spec=ExtractedMetadata)
-        mock_extracted_metadata.urgency_indicators = {
-            "high": ["urgent"],
-            "medium": [],
-            "low": [],
-        }  # Dict for calculate_urgency_score
-        mock_extracted_metadata.sentiment_indicators = {
-            "positive": [],
-            "negative": [],
-            "neutral": [],
-        }  # Dict for _determine_sentiment
-        mock_extracted_metadata.priority_keywords = [
-            "keyword1"
-        ]  # List for slicing in _create_email_analysis
-        mock_extracted_metadata.action_words = ["action1"]  # List for slicing
-        mock_extracted_metadata.temporal_references = ["ref1"]  # List for slicing
-        mock_extracted_metadata.contact_info = {}
-        mock_extracted_metadata.links = []
-
-        mock_email_extractor_instance.extract_from_email.return_value = (
-            mock_extracted_metadata
+        webhook_mocks.config.postmark_webhook_secret = None
+
+        # Fail late in the pipeline, after extraction, analysis and storage
+        mock_update_stats = MagicMock(
+            side_effect=Exception("Unexpected boom in stats update!")
         )
-        mock_email_extractor_instance.calculate_urgency_score.return_value = (10, "low")
+        monkeypatch.setattr("src.webhook._update_stats", mock_update_stats)
+
+        # Real ExtractedMetadata; only the analysis fields matter here
+        webhook_mocks.extractor.extract_from_email.return_value = _metadata(
+            urgency_indicators={"high": ["urgent"], "medium": [], "low": []},
+            priority_keywords=["keyword1"],
+            action_words=["action1"],
+            temporal_references=["ref1"],
+        )
+        webhook_mocks.extractor.calculate_urgency_score.return_value = (10, "low")
 
-        # mock_process_plugins and mock_save_db will be called if no prior exception
         async def passthrough_plugin(email, pid):
             return email
 
-        mock_process_plugins.side_effect = passthrough_plugin
-        mock_save_db.return_value = None
+        webhook_mocks.plugins.side_effect = passthrough_plugin
 
         initial_errors = storage.stats.total_errors
-        response = client.post("/webhook", json=sample_postmark_payload)
+        request = _StubRequest(json.dumps(sample_postmark_payload).encode("utf-8"))
+        with pytest.raises(HTTPException) as exc_info:
+            await handle_postmark_webhook(request, x_postmark_signature=None)
 
-        assert response.status_code == 500
-        assert "An unexpected error occurred" in response.json()["detail"]
+        assert exc_info.value.status_code == 500
+        assert "An unexpected error occurred" in exc_info.value.detail
         assert storage.stats.total_errors == initial_errors + 1
-        mock_logger.log_processing_error.assert_called()
-        args, _ = mock_logger.log_processing_error.call_args
+        mock_update_stats.assert_called_once()
+        webhook_mocks.logger.log_processing_error.assert_called()
+        args, _ = webhook_mocks.logger.log_processing_error.call_args
         assert isinstance(args[0], Exception)
         assert "Unexpected boom in stats update!" in str(args[0])
 
+    @pytest.mark.asyncio
+    @patch("src.webhook.logger")
+    async def test_webhook_invalid_json(self, mock_logger):
+        """Malformed bodies are rejected with a 400 before any processing."""
+        app_config.postmark_webhook_secret = None
+
+        with pytest.raises(HTTPException) as exc_info:
+            await handle_postmark_webhook(
+                _StubRequest(b"{not valid json"), x_postmark_signature=None
+            )
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Invalid JSON payload."
+        assert storage.email_storage == {}
+        args, _ = mock_logger.log_processing_error.call_args
+        assert args[1]["error_type"] == "json_decode"
+
+    @pytest.mark.asyncio
+    @patch("src.webhook.logger")
+    async def test_webhook_undecodable_body(self, mock_logger):
+        """Non-UTF-8 bodies get the same 400 as invalid JSON, not a 500."""
+        app_config.postmark_webhook_secret = None
+
+        with pytest.raises(HTTPException) as exc_info:
+            await handle_postmark_webhook(
+                _StubRequest(b"\xff\xfe{}"), x_postmark_signature=None
+            )
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Invalid JSON payload."
+        assert storage.stats.total_errors == 0
+        args, _ = mock_logger.log_processing_error.call_args
+        assert isinstance(args[0], UnicodeDecodeError)
+
+    @pytest.mark.asyncio
+    @patch("src.webhook.logger")
+    async def test_webhook_payload_validation_error(
+        self, mock_logger, sample_postmark_payload
+    ):
+        """Payloads missing required Postmark fields are rejected with a 422."""
+        app_config.postmark_webhook_secret = None
+        payload = {k: v for k, v in sample_postmark_payload.items() if k != "From"}
+
+        with pytest.raises(HTTPException) as exc_info:
+            await handle_postmark_webhook(
+                _StubRequest(json.dumps(payload).encode("utf-8")),
+                x_postmark_signature=None,
+            )
+
+        assert exc_info.value.status_code == 422
+        assert "Validation error" in exc_info.value.detail
+        assert storage.stats.total_errors == 0
+
 
 # Test for __main__ block
 @patch("uvicorn.run")
@@ -479,138 +601,89 @@ def test_main_block_runs_uvicorn(mock_logger_main, mock_uvicorn_run):
 
 
 @patch.dict(sys.modules, {"src.api_routes": None})
-@patch("src.webhook.logger.warning")  # Patch the specific logger method
-def test_api_routes_import_failure(mock_logger_warning, client):
+def test_api_routes_import_failure():
     """Test logger warning when api_routes cannot be imported."""
-    import importlib
+    bare_app = FastAPI()
+    mock_logger = MagicMock()
+
+    assert _try_register_api_routes(bare_app, mock_logger) is False
 
-    from src import webhook  # Import it here to see if the warning is logged
+    warning = mock_logger.warning.call_args[0][0]
+    assert "Could not load API routes module" in warning
+    assert not any(route.path.startswith("/api") for route in bare_app.routes)
 
-    # To ensure the try-except block for api_router import is hit upon reload
-    # it's important that 'src.api_routes' is indeed missing from sys.modules during reload.
-    # The patch.dict should handle this.
-    importlib.reload(webhook)
 
-    # Check if the specific warning was logged
-    found_warning = False
-    for call_args_list in mock_logger_warning.call_args_list:
-        if (
-            call_args_list
-            and "Could not load API routes module" in call_args_list[0][0]
-        ):
-            found_warning = True
-            break
-    assert found_warning, "Logger warning for missing api_routes was not logged."
+def test_api_routes_registration():
+    """Test the API router is mounted under /api when importable."""
+    bare_app = FastAPI()
+    mock_logger = MagicMock()
+
+    assert _try_register_api_routes(bare_app, mock_logger) is True
+    assert any(route.path.startswith("/api") for route in bare_app.routes)
 
 
 @patch.dict(os.environ, {"VERCEL": "1", "AWS_LAMBDA_FUNCTION_NAME": ""})
-@patch("src.webhook.logger.info")  # Patch logger.info specifically
-def test_serverless_env_config_vercel(mock_logger_info):
+def test_serverless_env_config_vercel():
     """Test serverless environment specific config for Vercel."""
-    from src import config as live_config  # Import the actual config instance
-    from src import webhook as live_webhook  # Import the actual webhook module
+    serverless_config = ServerConfig(
+        log_format="text", enable_console_colors=True, max_processing_time=60
+    )
+    mock_logger = MagicMock()
 
-    original_live_log_format = live_config.config.log_format
-    original_live_colors = live_config.config.enable_console_colors
-    original_max_processing_time = live_config.config.max_processing_time
-    original_enable_async_processing = live_config.config.enable_async_processing
+    assert _apply_serverless_config(serverless_config, mock_logger) is True
 
-    try:
-        import importlib
+    # Check that config values were changed for the serverless environment
+    assert serverless_config.log_format == "json"
+    assert serverless_config.enable_console_colors is False
+    assert serverless_config.max_processing_time == 25
+    assert serverless_config.enable_async_processing is True
+    mock_logger.setup_logging.assert_called_once()
 
-        # Reload config first as webhook.py reads from it at module level
-        importlib.reload(live_config)
-        importlib.reload(live_webhook)  # This re-runs the SERVERLESS_ENV block
+    messages = [call_args[0][0] for call_args in mock_logger.info.call_args_list]
+    assert any("Running in serverless environment" in m for m in messages)
+    assert any("Switching log_format to JSON" in m for m in messages)
 
-        assert live_webhook.SERVERLESS_ENV is True
-        assert live_webhook.VERCEL_ENV is True
 
-        # Check that config values were changed by the SERVERLESS_ENV block
-        assert live_config.config.log_format == "json"
-        assert live_config.config.enable_console_colors is False
-        assert (
-            live_config.config.max_processing_time <= 25
-        )  # As per logic in webhook.py
-        assert live_config.config.enable_async_processing is True  # As per logic
-
-        # Check for specific logger calls
-        logs_found = {
-            "running_in_serverless": False,
-            "switching_to_json": False,
-        }
-        for call_args_list in mock_logger_info.call_args_list:
-            if (
-                call_args_list
-                and "Running in serverless environment" in call_args_list[0][0]
-            ):
-                logs_found["running_in_serverless"] = True
-            if (
-                call_args_list
-                and "Switching log_format to JSON" in call_args_list[0][0]
-            ):
-                logs_found["switching_to_json"] = True
-
-        assert logs_found[
-            "running_in_serverless"
-        ], "Log for running in serverless not found"
-        # This log only happens if original format was not json
-        # To test it deterministically, we'd need to set app_config.log_format before reload
-        # For now, we can assume it's covered if log_format becomes "json"
-
-    finally:
-        # Restore original config values to prevent test interference
-        live_config.config.log_format = original_live_log_format
-        live_config.config.enable_console_colors = original_live_colors
-        live_config.config.max_processing_time = original_max_processing_time
-        live_config.config.enable_async_processing = original_enable_async_processing
-        # Reload again to restore non-serverless state for other tests if os.environ was globally changed
-        # If only os.getenv was used inside the block, direct restoration of config is enough.
-        with patch.dict(os.environ, {"VERCEL": "0", "AWS_LAMBDA_FUNCTION_NAME": ""}):
-            importlib.reload(live_config)
-            importlib.reload(live_webhook)
+@patch.dict(os.environ, {"VERCEL": "0"})
+def test_serverless_config_untouched_outside_serverless():
+    """Test config is left alone when no serverless environment is detected."""
+    os.environ.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+    local_config = ServerConfig(log_format="text", enable_console_colors=True)
+    mock_logger = MagicMock()
+
+    assert _apply_serverless_config(local_config, mock_logger) is False
+    assert local_config.log_format == "text"
+    assert local_config.enable_console_colors is True
+    mock_logger.setup_logging.assert_not_called()
 
 
 # Keep TestWebhookIntegration as is, assuming it's working with prior corrections.
 class TestWebhookIntegration:
     """Test webhook integration scenarios"""
 
-    @patch("src.webhook.config")  # Changed from src.webhook.app_config
-    @patch("src.webhook.email_extractor")
-    @patch("src.webhook.logger")
-    @patch("src.webhook._process_through_plugins", new_callable=AsyncMock)
-    @patch("src.webhook._save_to_database", new_callable=AsyncMock)
     def test_complete_email_processing_flow(
-        self,
-        mock_save_db,
-        mock_plugins,
-        mock_logger,
-        mock_email_extractor_instance,
-        mock_app_config_instance,
-        sample_postmark_payload,
-        client,
+        self, webhook_mocks, sample_postmark_payload, client
     ):
-        mock_app_config_instance.webhook_endpoint = "/webhook"
-        mock_app_config_instance.postmark_webhook_secret = None
-
-        mock_metadata = MagicMock(spec=ExtractedMetadata)
-        mock_metadata.urgency_indicators = {
-            "high": ["urgent", "asap"],
-            "medium": [],
-            "low": [],
-        }
-        mock_metadata.sentiment_indicators = {
-            "positive": ["excellent"],
-            "negative": [],
-            "neutral": [],
-        }
-        mock_metadata.priority_keywords = ["important", "deadline"]
-        mock_metadata.action_words = ["review", "approve"]
-        mock_metadata.temporal_references = ["tomorrow", "3pm"]
-        mock_metadata.contact_info = {}
-        mock_metadata.links = []
-
-        mock_email_extractor_instance.extract_from_email.return_value = mock_metadata
-        mock_email_extractor_instance.calculate_urgency_score.return_value = (
+        webhook_mocks.config.webhook_endpoint = "/webhook"
+        webhook_mocks.config.postmark_webhook_secret = None
+
+        # A real (dataclass) ExtractedMetadata: plain attribute reads, no mock
+        metadata = ExtractedMetadata(
+            urgency_indicators={"high": ["urgent", "asap"], "medium": [], "low": []},
+            sentiment_indicators={
+                "positive": ["excellent"],
+                "negative": [],
+                "neutral": [],
+            },
+            priority_keywords=["important", "deadline"],
+            action_words=["review", "approve"],
+            temporal_references=["tomorrow", "3pm"],
+            contact_info={},
+            links=[],
+        )
+
+        webhook_mocks.extractor.extract_from_email.return_value = metadata
+        webhook_mocks.extractor.calculate_urgency_score.return_value = (
             85,
             "high",
         )
@@ -618,11 +691,94 @@ class TestWebhookIntegration:
         async def passthrough_plugin(email, pid):
             return email
 
-        mock_plugins.side_effect = passthrough_plugin
+        webhook_mocks.plugins.side_effect = passthrough_plugin
 
         response = client.post(
-            mock_app_config_instance.webhook_endpoint, json=sample_postmark_payload
+            webhook_mocks.config.webhook_endpoint, json=sample_postmark_payload
         )
 
         assert response.status_code == 200
         # ... (rest of assertions as before) ...
+
+    def test_batch_webhook_processing(self, client, sample_postmark_payload):
+        app_config.postmark_webhook_secret = None
+        batch = [
+            {**sample_postmark_payload, "MessageID": f"batch-{i}@example.com"}
+            for i in range(100)
+        ]
+
+        response = client.post("/webhook/batch", json=batch)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["processed"] == 100
+        assert data["failed"] == 0
+        assert [r["message_id"] for r in data["results"]] == [
+            p["MessageID"] for p in batch
+        ]
+        assert len(storage.email_storage) == 100
+        assert storage.stats.total_processed == 100
+
+    def test_batch_webhook_rejects_invalid_batches(
+        self, client, sample_postmark_payload
+    ):
+        app_config.postmark_webhook_secret = None
+
+        response = client.post("/webhook/batch", json=sample_postmark_payload)
+        assert response.status_code == 422
+        assert response.json()["detail"] == "Batch payload must be a JSON array."
+
+        invalid_item = {k: v for k, v in sample_postmark_payload.items() if k != "From"}
+        response = client.post(
+            "/webhook/batch", json=[sample_postmark_payload, invalid_item]
+        )
+        assert response.status_code == 422
+        assert len(storage.email_storage) == 0
+
+        with patch("src.webhook.config.webhook_batch_max_size", 1):
+            response = client.post("/webhook/batch", json=[sample_postmark_payload] * 2)
+        assert response.status_code == 413
+
+    def test_batch_webhook_handles_errors_before_processing(
+        self, client, sample_postmark_payload
+    ):
+        app_config.postmark_webhook_secret = None
+
+        with patch("src.webhook.logger") as mock_logger:
+            response = client.post(
+                "/webhook/batch",
+                content=b"\xff\xfe[]",
+                headers={"content-type": "application/json"},
+            )
+            assert response.status_code == 400
+            assert response.json()["detail"] == "Invalid JSON payload."
+            error = mock_logger.log_processing_error.call_args.args[0]
+            assert isinstance(error, UnicodeDecodeError)
+
+            with patch("src.webhook.PostmarkWebhookPayload") as payload_model:
+                payload_model.model_validate.side_effect = RuntimeError("boom")
+                response = client.post("/webhook/batch", json=[sample_postmark_payload])
+            assert response.status_code == 500
+            assert "An unexpected error occurred" in response.json()["detail"]
+            error = mock_logger.log_processing_error.call_args.args[0]
+            assert isinstance(error, RuntimeError)
+
+        assert storage.stats.total_errors == 1
+        assert len(storage.email_storage) == 0
+
+    def test_batch_webhook_reports_item_failures(self, client, sample_postmark_payload):
+        app_config.postmark_webhook_secret = None
+        bad_date = {**sample_postmark_payload, "Date": "not a date"}
+
+        response = client.post(
+            "/webhook/batch", json=[sample_postmark_payload, bad_date]
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "partial"
+        assert (data["processed"], data["failed"]) == (1, 1)
+        assert data["results"][1]["status"] == "error"
+        assert len(storage.email_storage) == 1
+        assert storage.stats.total_errors == 1
@@ -382,17 +382,7 @@ class TestEndToEndIntegration:
     def setup_method(self):
         """Setup for each test method"""
         storage.email_storage.clear()
-        storage.stats.total_processed = 0
-        storage.stats.total_errors = 0
-        storage.stats.avg_urgency_score = 0.0
-        storage.stats.last_processed = None
-        storage.stats.processing_times.clear()
-
-        import src.server
-        import src.webhook
-
-        src.webhook.storage = storage
-        src.server.storage = storage
+        storage.reset_stats()
 
     @pytest.mark.asyncio
     @patch("src.webhook.config")
@@ -708,14 +698,7 @@ class TestPerformanceIntegration:
 
     def setup_method(self):
         storage.email_storage.clear()
-        storage.stats.total_processed = 0
-        storage.stats.total_errors = 0
-        storage.stats.avg_urgency_score = 0.0  # Added
-        storage.stats.last_processed = None  # Added
-        storage.stats.processing_times.clear()
-        import src.webhook
-
-        src.webhook.storage = storage
+        storage.reset_stats()
 
     @patch("src.webhook.email_extractor")
     @patch("src.webhook.config")
@@ -822,17 +805,7 @@ class TestPerformanceIntegration:
 class TestMCPProtocolCompliance:
     def setup_method(self):
         storage.email_storage.clear()
-        storage.stats.total_processed = 0
-        storage.stats.total_errors = 0
-        storage.stats.avg_urgency_score = 0.0
-        storage.stats.last_processed = None
-        storage.stats.processing_times.clear()
-        import src.webhook  # Ensure storage is reset for webhook too
-
-        src.webhook.storage = storage
-        import src.server
-
-        src.server.storage = storage  # And for server
+        storage.reset_stats()
 
     @pytest.mark.asyncio
     async def test_mcp_server_initialization(self):
@@ -10,18 +10,33 @@ Tests verify that the server meets performance requirements:
 
 import asyncio
 import gc
+import json
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 from unittest.mock import patch
 
+import httpx
 import psutil
+import pytest
+from fastapi.testclient import TestClient
 
-from src import server
+from src import server, storage
 from src.extraction import EmailExtractor
 from src.models import EmailData, EmailStatus, ProcessedEmail
-from src.storage import email_storage, stats
+from src.server import reset_realtime_interface
+from src.storage import SHARD_COUNT, ShardedEmailStorage, email_storage
+from src.webhook import app
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+@pytest.fixture(scope="class")
+def client():
+    """One TestClient per test class so its transport is built only once."""
+    return TestClient(app)
 
 
 class TestEmailProcessingPerformance:
@@ -30,23 +45,9 @@ class TestEmailProcessingPerformance:
     def setup_method(self):
         """Reset storage and setup test environment."""
         email_storage.clear()
-        stats.total_processed = 0
-        stats.total_errors = 0
-        stats.avg_urgency_score = 0.0
-        stats.last_processed = None
-        stats.processing_times.clear()
-
-        # Ensure server uses the same storage instance
-        import src.server  # noqa: E402
-
-        src.server.email_storage = email_storage
-        import src.webhook  # noqa: E402
-
-        src.webhook.email_storage = email_storage
+        storage.reset_stats()
 
         # Reset realtime interface to prevent test interference
-        from src.server import reset_realtime_interface
-
         reset_realtime_interface()
 
     def test_single_email_processing_time(self, benchmark, sample_postmark_payload):
@@ -134,7 +135,7 @@ class TestEmailProcessingPerformance:
         """Test MCP tool response times."""
         # Setup storage with test data
         email_storage["test-001"] = sample_email_data
-        stats.total_processed = 1
+        storage.stats.total_processed = 1
 
         async def run_analyze_tool():
             # Simulate MCP tool call
@@ -154,20 +155,16 @@ class TestEmailProcessingPerformance:
 
         print(f"MCP tool response time: {benchmark.stats['mean']:.4f}s")
 
-    def test_webhook_processing_performance(self, benchmark, sample_postmark_payload):
+    def test_webhook_processing_performance(
+        self, benchmark, client, sample_postmark_payload
+    ):
         """Test webhook processing performance."""
-        from fastapi.testclient import TestClient
-
-        from src.webhook import app
-
         # Mock config to disable signature verification for performance testing
         with patch("src.webhook.config") as mock_config:
             mock_config.webhook_endpoint = "/webhook"
             mock_config.postmark_webhook_secret = None  # Disable signature verification
 
             def process_webhook():
-                # Create test client and process webhook
-                client = TestClient(app)
                 response = client.post("/webhook", json=sample_postmark_payload)
                 return response
 
@@ -187,29 +184,15 @@ class TestConcurrentProcessing:
     def setup_method(self):
         """Reset storage and setup test environment."""
         email_storage.clear()
-        stats.total_processed = 0
-        stats.total_errors = 0
-        stats.avg_urgency_score = 0.0
-        stats.last_processed = None
-        stats.processing_times.clear()
-
-        # Ensure consistent storage
-        import src.server  # noqa: E402
-
-        src.server.email_storage = email_storage
-        import src.webhook  # noqa: E402
-
-        src.webhook.email_storage = email_storage
+        storage.reset_stats()
 
         # Reset realtime interface to prevent test interference
-        from src.server import reset_realtime_interface
-
         reset_realtime_interface()
 
-    def test_concurrent_webhook_processing(self):
+    @pytest.mark.parametrize("num_threads", [1, 8, 64])
+    def test_concurrent_webhook_processing(self, benchmark, num_threads):
         """Test concurrent webhook processing with multiple threads."""
         extractor = EmailExtractor()
-        num_threads = 5
         emails_per_thread = 3
 
         def process_emails(thread_id: int) -> List[Dict[str, Any]]:
@@ -256,19 +239,26 @@ class TestConcurrentProcessing:
 
             return results
 
-        # Run concurrent processing
-        start_time = time.time()
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [executor.submit(process_emails, i) for i in range(num_threads)]
-            all_results = []
-            for future in futures:
-                thread_results = future.result()
-                all_results.extend(thread_results)
+        def run_concurrently() -> List[Dict[str, Any]]:
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                return [
+                    result
+                    for thread_results in executor.map(
+                        process_emails, range(num_threads)
+                    )
+                    for result in thread_results
+                ]
+
+        # Run concurrent processing once; the spread across worker counts is
+        # what shows whether throughput scales or plateaus on contention
+        start_time = time.perf_counter_ns()
+        all_results = benchmark.pedantic(run_concurrently, rounds=1, iterations=1)
+        total_time = (time.perf_counter_ns() - start_time) / 1e9
 
-        total_time = time.time() - start_time
+        expected_total_emails = num_threads * emails_per_thread
+        benchmark.extra_info["emails_per_sec"] = expected_total_emails / total_time
 
         # Verify results
-        expected_total_emails = num_threads * emails_per_thread
         assert len(all_results) == expected_total_emails
         assert len(email_storage) == expected_total_emails
 
@@ -294,6 +284,97 @@ class TestConcurrentProcessing:
             avg_processing_time < 1.0
         ), f"Average processing time {avg_processing_time:.4f}s is too high"
 
+    def test_concurrent_webhook_contention_metric(self, signalling_shard_lock):
+        """Test sharding spares writers the lock wait a single lock imposes."""
+        num_workers = 5
+        held_key = "contention-held"
+        processed_email = ProcessedEmail(
+            id=held_key,
+            email_data=EmailData(
+                from_email="worker@example.com",
+                to_emails=["recipient@example.com"],
+                subject="Contention Email",
+                message_id=held_key,
+                received_at=datetime(2025, 5, 28, 10, 30, tzinfo=timezone.utc),
+            ),
+            status=EmailStatus.RECEIVED,
+        )
+
+        def wait_with_one_shard_held(shard_count: int) -> int:
+            store = ShardedEmailStorage(shard_count)
+            held = store._index_for(held_key)
+            # Keys outside the held shard, unless there is only one shard
+            keys = [
+                key
+                for key in (f"contention-{i}" for i in range(1000))
+                if shard_count == 1 or store._index_for(key) != held
+            ][:num_workers]
+            writers = [
+                threading.Thread(target=store.__setitem__, args=(key, processed_email))
+                for key in keys
+            ]
+            lock = signalling_shard_lock(store, held)
+            with lock:
+                for writer in writers:
+                    writer.start()
+                if shard_count == 1:
+                    # Every writer has to queue behind the held lock
+                    assert lock.wait_for_blocked(num_workers)
+                else:
+                    # Writers to other shards finish while the lock is held
+                    for writer in writers:
+                        writer.join(timeout=5)
+                    assert not any(writer.is_alive() for writer in writers)
+            for writer in writers:
+                writer.join()
+            assert len(store) == num_workers
+            return store.contention_wait_ns()
+
+        single_lock_wait_ns = wait_with_one_shard_held(1)
+        sharded_wait_ns = wait_with_one_shard_held(SHARD_COUNT)
+        print(
+            f"Lock wait across {num_workers} writers: "
+            f"single lock {single_lock_wait_ns / 1e6:.3f}ms, "
+            f"{SHARD_COUNT} shards {sharded_wait_ns / 1e6:.3f}ms"
+        )
+
+        assert single_lock_wait_ns > 0
+        assert sharded_wait_ns == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_webhook_processing_async(self, sample_postmark_payload):
+        """Test concurrent webhook requests interleaved on a single event loop."""
+        num_requests = 50
+        # Encode bodies up front so the timing covers the server, not json.dumps
+        bodies = [
+            json.dumps(
+                {**sample_postmark_payload, "MessageID": f"concurrent-{i}"}
+            ).encode()
+            for i in range(num_requests)
+        ]
+
+        with patch("src.webhook.config.postmark_webhook_secret", None):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as async_client:
+                start_time = time.time()
+                responses = await asyncio.gather(
+                    *(
+                        async_client.post(
+                            "/webhook", content=body, headers=_JSON_HEADERS
+                        )
+                        for body in bodies
+                    )
+                )
+                total_time = time.time() - start_time
+
+        assert all(response.status_code == 200 for response in responses)
+        assert len(email_storage) == num_requests
+        assert storage.stats.total_processed == num_requests
+
+        print(f"Async concurrent webhooks: {num_requests / total_time:.2f} req/s")
+
     def test_concurrent_mcp_tool_calls(self):
         """Test concurrent MCP tool calls."""
         # Setup test data
@@ -308,7 +389,7 @@ class TestConcurrentProcessing:
             )
             email_storage[f"test-{i:03d}"] = email_data
 
-        stats.total_processed = 10
+        storage.stats.total_processed = 10
 
         async def call_tool(tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
             """Call MCP tool."""
@@ -365,11 +446,7 @@ class TestMemoryUsage:
     def setup_method(self):
         """Reset storage and setup test environment."""
         email_storage.clear()
-        stats.total_processed = 0
-        stats.total_errors = 0
-        stats.avg_urgency_score = 0.0
-        stats.last_processed = None
-        stats.processing_times.clear()
+        storage.reset_stats()
         # Reset realtime interface to prevent test interference
         server.realtime_interface = None
 
@@ -453,11 +530,7 @@ class TestMemoryUsage:
 
         # Clear storage
         email_storage.clear()
-        stats.total_processed = 0
-        stats.total_errors = 0
-        stats.avg_urgency_score = 0.0
-        stats.last_processed = None
-        stats.processing_times.clear()
+        storage.reset_stats()
 
         # Force garbage collection
         gc.collect()
@@ -473,7 +546,7 @@ class TestMemoryUsage:
 
         # Verify cleanup was effective
         assert len(email_storage) == 0, "Storage was not properly cleared"
-        assert stats.total_processed == 0, "Stats were not properly reset"
+        assert storage.stats.total_processed == 0, "Stats were not properly reset"
 
 
 class TestScalabilityLimits:
@@ -482,11 +555,7 @@ class TestScalabilityLimits:
     def setup_method(self):
         """Reset storage and setup test environment."""
         email_storage.clear()
-        stats.total_processed = 0
-        stats.total_errors = 0
-        stats.avg_urgency_score = 0.0
-        stats.last_processed = None
-        stats.processing_times.clear()
+        storage.reset_stats()
         # Reset realtime interface to prevent test interference
         server.realtime_interface = None
 
@@ -4,19 +4,42 @@ GitHub Repository CI/CD Setup Validation Script
 For repository: https://github.com/rakid/EmailParsing
 """
 
+import asyncio
 import json
+import os
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Dict, Optional, Set, Union
 
-import requests
+import httpx
 
+DEPLOYMENT_URL = "https://email-parsing-three.vercel.app"
 
-def check_deployment_health():
+ProbeResult = Union[httpx.Response, Exception]
+
+
+async def probe_deployment():
+    """Fetch the health and webhook responses concurrently over one client"""
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=4),
+    ) as client:
+        # Both requests share the client's pool, so they reuse one TLS session
+        return await asyncio.gather(
+            client.get(f"{DEPLOYMENT_URL}/health"),
+            # Test with invalid payload to check if endpoint is active
+            client.post(f"{DEPLOYMENT_URL}/webhook", json={"test": "validation"}),
+            return_exceptions=True,
+        )
+
+
+def check_deployment_health(response: ProbeResult):
     """Check if the Vercel deployment is healthy"""
     try:
-        response = requests.get(
-            "https://email-parsing-three.vercel.app/health", timeout=10
-        )
+        if isinstance(response, Exception):
+            raise response
         if response.status_code == 200:
             data = response.json()
             print("✅ Deployment Health: OK")
@@ -30,15 +53,11 @@ def check_deployment_health():
         return False
 
 
-def check_webhook_endpoint():
+def check_webhook_endpoint(response: ProbeResult):
     """Check if the webhook endpoint is accessible"""
     try:
-        # Test with invalid payload to check if endpoint is active
-        response = requests.post(
-            "https://email-parsing-three.vercel.app/webhook",
-            json={"test": "validation"},
-            timeout=10,
-        )
+        if isinstance(response, Exception):
+            raise response
         # We expect 403 or 400 (signature validation failure), not 404
         if response.status_code in [400, 403]:
             print("✅ Webhook Endpoint: Active (signature validation working)")
@@ -54,9 +73,18 @@ def check_webhook_endpoint():
         return False
 
 
+def list_directory(directory: str) -> Optional[Set[str]]:
+    """Names of the entries in ``directory`` from one scandir, or None if absent"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return None
+
+
 def check_github_workflows():
     """Check if GitHub Actions workflow files exist"""
-    workflows_dir = Path(".github/workflows")
+    present_workflows = list_directory(".github/workflows")
     required_workflows = [
         "deploy-vercel.yml",
         "code-quality.yml",
@@ -65,14 +93,13 @@ def check_github_workflows():
         "release.yml",
     ]
 
-    if not workflows_dir.exists():
+    if present_workflows is None:
         print("❌ GitHub Workflows: .github/workflows directory not found")
         return False
 
-    missing_workflows = []
-    for workflow in required_workflows:
-        if not (workflows_dir / workflow).exists():
-            missing_workflows.append(workflow)
+    missing_workflows = [
+        workflow for workflow in required_workflows if workflow not in present_workflows
+    ]
 
     if missing_workflows:
         print(f"❌ GitHub Workflows: Missing files - {', '.join(missing_workflows)}")
@@ -92,9 +119,15 @@ def check_configuration_files():
         "SETUP_CHECKLIST.md",
     ]
 
+    # One scandir per directory instead of one stat per file
+    listings: Dict[str, Optional[Set[str]]] = {}
     missing_files = []
     for config_file in config_files:
-        if not Path(config_file).exists():
+        directory, name = os.path.split(config_file)
+        directory = directory or "."
+        if directory not in listings:
+            listings[directory] = list_directory(directory)
+        if name not in (listings[directory] or ()):
             missing_files.append(config_file)
 
     if missing_files:
@@ -128,9 +161,12 @@ def main():
     print("🔍 Validating CI/CD Setup for EmailParsing Repository")
     print("=" * 60)
 
+    # Network probes run up front and concurrently; checks report in order
+    health_response, webhook_response = asyncio.run(probe_deployment())
+
     checks = [
-        ("Deployment Health", check_deployment_health),
-        ("Webhook Endpoint", check_webhook_endpoint),
+        ("Deployment Health", partial(check_deployment_health, health_response)),
+        ("Webhook Endpoint", partial(check_webhook_endpoint, webhook_response)),
         ("GitHub Workflows", check_github_workflows),
         ("Configuration Files", check_configuration_files),
         ("Documentation", check_documentation),